@@ -7,19 +7,20 @@ Poll CSFloat listings, compute discounts versus
 (2) the median of recent real sales,
 and print bargains that beat user-supplied thresholds.
 
-Dependencies:  requests  python-dateutil
-    pip install requests python-dateutil
+Requires Python ≥ 3.10 (the floor set by requirements.txt).
+Dependencies:  requests  orjson
+    pip install requests orjson
+Optional:      numpy  (faster medians for --history-limit in the hundreds)
 """
 
 from __future__ import annotations
 import argparse, concurrent.futures as futures, datetime as dt
-import functools, json, os, sys, time, urllib.parse
-from collections import OrderedDict
-from statistics import median
-from typing import Any, Dict, List, Optional
+import functools, json, os, sys, threading, time, urllib.parse
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 import requests
-from dateutil import parser as dparse
+from requests.adapters import HTTPAdapter
 
 # ───────────────────────── configurable constants
 BASE          = "https://csfloat.com/api/v1"
@@ -27,35 +28,52 @@ LIST_URL      = f"{BASE}/listings"
 HIST_URL_TMPL = f"{BASE}/history/{{}}/sales?paint_index={{}}"
 TIMEOUT       = 15       # seconds for HTTP
 RETRY_SLEEP   = 10       # after 429/5xx
-POOL_WORKERS  = 1
+POOL_WORKERS  = 16       # parallel history fetches
 HIST_TTL      = dt.timedelta(minutes=10)
 HIST_MAX      = 4096     # LRU cache size
+SEPARATOR     = '-' * 40
+NP_MEDIAN_MIN = 256      # sales count from which np.partition beats sorted()
 
 # ───────────────────────── tiny LRU-TTL cache for trade history
-class _HistCache(OrderedDict):
+class _HistCache:
+    # plain dict keeps insertion order and is leaner than OrderedDict;
+    # pop + re-insert moves a key to the MRU end.
+    # entries are bare (prices, ts) tuples – no per-entry __dict__; if an
+    # entry ever needs more fields, make it a class with __slots__.
+    # shared by the fetch_hist pool threads, so get/put hold a lock
     def __init__(self, ttl: dt.timedelta, maxlen: int):
-        super().__init__()
-        self.ttl, self.maxlen = ttl, maxlen
+        self._d: dict = {}
+        self._lock = threading.Lock()
+        self.ttl_seconds, self.maxlen = ttl.total_seconds(), maxlen
 
-    def get(self, key: str) -> Optional[List[int]]:
-        try:
-            prices, ts = super().pop(key)
-            if dt.datetime.utcnow() - ts < self.ttl:
-                super().__setitem__(key, (prices, ts))  # refresh LRU order
+    def get(self, key: Tuple[str, int]) -> Optional[List[Tuple[int, str]]]:
+        with self._lock:
+            v = self._d.pop(key, None)
+            if v is None:
+                return None
+            prices, ts = v
+            if time.monotonic() - ts < self.ttl_seconds:
+                self._d[key] = v  # refresh LRU order
                 return prices
-        except KeyError:
-            pass
-        return None
+            return None
 
-    def put(self, key: str, prices: List[int]) -> None:
-        if key in self:
-            super().pop(key)
-        elif len(self) >= self.maxlen:
-            self.popitem(last=False)
-        super().__setitem__(key, (prices, dt.datetime.utcnow()))
+    def put(self, key: Tuple[str, int],
+            prices: List[Tuple[int, str]]) -> None:
+        with self._lock:
+            if key in self._d:
+                del self._d[key]
+            elif len(self._d) >= self.maxlen:
+                del self._d[next(iter(self._d))]  # evict LRU
+            self._d[key] = (prices, time.monotonic())
 
 hist_cache = _HistCache(HIST_TTL, HIST_MAX)
 
+# ───────────────────────── shared HTTP session (keep-alive + pooling)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4,
+                                       pool_maxsize=POOL_WORKERS * 2,
+                                       max_retries=0))
+
 # ───────────────────────── helpers
 def read_key(file_path: str) -> str:
     try:
@@ -71,17 +89,16 @@ def read_key(file_path: str) -> str:
     sys.exit(f"[fatal] no API key found (file {file_path!r} missing and "
              "CSFLOAT_API_KEY not set)")
 
-def _request(method: str, url: str, key: str, **kwargs) -> Any:
-    headers = {"Authorization": key}
+def _request(method: str, url: str, **kwargs) -> Any:
     kwargs.setdefault("timeout", TIMEOUT)
     while True:
         try:
-            resp = requests.request(method, url, headers=headers, **kwargs)
+            resp = _SESSION.request(method, url, **kwargs)
         except requests.RequestException as e:
             print(f"[net] {e} – retrying in {RETRY_SLEEP}s", file=sys.stderr)
             time.sleep(RETRY_SLEEP); continue
         if resp.status_code == 200:
-            return resp.json()
+            return orjson.loads(resp.content)
         if resp.status_code in (429, 503):
             print(f"[rate-limit] {url} => {resp.status_code}; sleep {RETRY_SLEEP}s",
                   file=sys.stderr)
@@ -90,27 +107,24 @@ def _request(method: str, url: str, key: str, **kwargs) -> Any:
               file=sys.stderr)
         return None
 
-def fetch_list(sort_by: str, limit: int, key: str) -> List[Dict[str, Any]]:
+def fetch_list(sort_by: str, limit: int) -> List[Dict[str, Any]]:
     params = {"limit": limit, "page": 0, "sort_by": sort_by, "min_price": 100, "type": "buy_now"}
-    data = _request("GET", LIST_URL, key, params=params)["data"]
+    data = _request("GET", LIST_URL, params=params)["data"]
     return data or []
 
-def fetch_hist(name: str, paint_index: int, key: str) -> List[int]:
-    cache_key = f"{name}"
-    if paint_index:
-        cache_key += "|{paint_index}"
+def fetch_hist(name: str, paint_index: int) -> List[Tuple[int, str]]:
+    cache_key = (name, paint_index)
     if (cached := hist_cache.get(cache_key)) is not None:
         return cached
     encoded = urllib.parse.quote(name, safe="")
     url = HIST_URL_TMPL.format(encoded, paint_index)
-    raw = _request("GET", url, key)
-    prices: List[int] = []
-    if isinstance(raw, list):
-        prices = [int(sale["price"])
-                  for sale in raw
-                  if sale.get("price") is not None]
-    hist_cache.put(cache_key, raw)
-    return raw
+    raw = _request("GET", url)
+    if not isinstance(raw, list):
+        return []   # don't cache failures
+    prices_dates = [(int(s["unit_price"]), s["created_at"])
+                    for s in raw if s.get("unit_price")]
+    hist_cache.put(cache_key, prices_dates)
+    return prices_dates
 
 def ml_discount(lst: Dict[str, Any]) -> Optional[float]:
     ref = lst.get("reference")
@@ -119,17 +133,38 @@ def ml_discount(lst: Dict[str, Any]) -> Optional[float]:
     pp, price = ref["predicted_price"], lst["price"]
     return 100 * (pp - price) / pp
 
+def _median(prices: List[int]) -> float:
+    n = len(prices)
+    if n >= NP_MEDIAN_MIN:
+        # linear-time selection in C for long histories; numpy is optional
+        # and only imported here, so the default short-history path never
+        # loads it
+        try:
+            import numpy as np
+        except ImportError:
+            pass
+        else:
+            k = n // 2
+            arr = np.fromiter(prices, dtype=np.int64, count=n)
+            if n & 1:
+                return int(np.partition(arr, k)[k])
+            part = np.partition(arr, (k - 1, k))
+            return (int(part[k - 1]) + int(part[k])) / 2
+    p = sorted(prices)   # inline median, skips statistics' dispatch
+    return p[n // 2] if n & 1 else (p[n // 2 - 1] + p[n // 2]) / 2
+
 def trade_discount(lst: Dict[str, Any], prices: List[int]) -> Optional[float]:
     if not prices:
         return None
-    med = median(prices)
+    med = _median(prices)
     if med <= 0:
         return None
     return 100 * (med - lst["price"]) / med
 
 def fmt(lst: Dict[str, Any], mld: Optional[float],
         tdd: Optional[float]) -> str:
-    stamp = dparse.isoparse(lst["created_at"]).strftime("%m-%d %H:%M")
+    c     = lst["created_at"]   # fixed-offset ISO8601: slice, don't parse
+    stamp = f"{c[5:7]}-{c[8:10]} {c[11:13]}:{c[14:16]}"
     price = lst["price"] / 100
     name  = lst["item"]["market_hash_name"]
     ml_s  = f"{mld:5.1f}%" if mld is not None else "  –  "
@@ -151,7 +186,10 @@ def main() -> None:
     ap.add_argument("--sort", choices=("most_recent", "highest_discount"),
                     default="most_recent", help="initial market sort key")
     ap.add_argument("--min-ml-discount", type=float, default=0.0,
-                    help="print when ML-discount ≥ this (0 = ignore)")
+                    help="print when ML-discount ≥ this (0 = ignore); without "
+                         "--min-trade-discount, listings that pass it skip the "
+                         "sales-history request and show a trade discount "
+                         "only if that history is already cached")
     ap.add_argument("--min-trade-discount", type=float, default=0.0,
                     help="print when trade-discount ≥ this (0 = ignore)")
     ap.add_argument("--history-days", type=int, default=7,
@@ -163,6 +201,7 @@ def main() -> None:
     args = ap.parse_args()
 
     key = read_key(args.key_file)
+    _SESSION.headers.update({"Authorization": key})
     print(f"[info] every {args.interval}s  limit={args.limit}  "
           f"sort={args.sort}  ml≥{args.min_ml_discount}%  "
           f"trade≥{args.min_trade_discount}%  hist={args.history_days}d",
@@ -177,40 +216,73 @@ def main() -> None:
         # require at least one condition to pass
         return ok_ml or ok_trd
 
-    while True:
-        listings = [l for l in fetch_list(args.sort, args.limit, key) if l["item"].get("paint_index", False)]
-        # collect unique item keys for history fetch
-        hist_keys = {(l["item"]["market_hash_name"], l["item"]["paint_index"])
-                     for l in listings}
-        # pull sales histories in parallel
-        with futures.ThreadPoolExecutor(max_workers=POOL_WORKERS) as pool:
-            hist_map = {hkey: pool.submit(fetch_hist, hkey[0], hkey[1], key=key)
-                        for hkey in hist_keys}
-        # now process listings
-        now = dt.datetime.utcnow() - dt.timedelta(days=args.history_days)
-        def recent(prices: List[int], dates: List[str]) -> List[int]:
-            return [p for p, d in zip(prices, dates)
-                    if dparse.isoparse(d) >= now]
-
-        for lst in listings:
-            name, pidx = lst["item"]["market_hash_name"], lst["item"]["paint_index"]
-            hist_json = hist_map[(name, pidx)].result()
-            # 'hist_json' holds raw sale dicts; filter last N days
-            if hist_json:
-                recent_sales = [s for s in hist_json
-                                if dparse.isoparse(s["created_at"]) >= now]
-                sale_prices = [int(s["unit_price"]) for s in recent_sales][:args.history_limit]
-            else:
-                sale_prices = []
-            mld = ml_discount(lst)
-            tdd = trade_discount(lst, sale_prices) if sale_prices else None
-            if qualifies(mld, tdd):
-                print(fmt(lst, mld, tdd))
-            print('-'*40)
-
-        if args.once:
-            break
-        time.sleep(args.interval)
+    def report(out: List[str], lst: Dict[str, Any], mld: Optional[float],
+               tdd: Optional[float]) -> None:
+        if qualifies(mld, tdd):
+            out.append(fmt(lst, mld, tdd))
+        out.append(SEPARATOR)
+
+    # with no trade threshold, history only feeds the trade column; skip
+    # the request for listings that already clear the ML threshold and
+    # show their trade discount from the cache when it is there
+    ml_only = args.min_trade_discount <= 0 and args.min_ml_discount > 0
+
+    # one pool for the whole run; threads overlap the network round-trips
+    with futures.ThreadPoolExecutor(max_workers=POOL_WORKERS) as pool:
+        while True:
+            listings = [l for l in fetch_list(args.sort, args.limit) if l["item"].get("paint_index", False)]
+            if not listings:
+                if args.once:
+                    break
+                time.sleep(args.interval)
+                continue
+            # unique item keys for history fetch; rows keep listing order
+            rows: List[tuple] = []
+            hist_keys: set = set()
+            for l in listings:
+                mld = ml_discount(l)
+                hkey = (l["item"]["market_hash_name"], l["item"]["paint_index"])
+                if not (ml_only and mld is not None and mld >= args.min_ml_discount):
+                    hist_keys.add(hkey)
+                rows.append((l, mld, hkey))
+            # pull sales histories in parallel
+            hist_futs = {pool.submit(fetch_hist, hkey[0], hkey[1]): hkey
+                         for hkey in hist_keys}
+            # uniform UTC ISO8601 strings sort chronologically, so compare
+            # them against the cutoff directly instead of parsing each one
+            now_iso = (dt.datetime.now(dt.timezone.utc)
+                       - dt.timedelta(days=args.history_days)
+                       ).strftime("%Y-%m-%dT%H:%M:%S")
+
+            def recent(hist: List[Tuple[int, str]]) -> List[int]:
+                return [p for p, created in hist
+                        if created >= now_iso][:args.history_limit]
+
+            # filter last N days once per item key as each history arrives
+            sale_map: Dict[tuple, List[int]] = {}
+            for fut in futures.as_completed(hist_futs):
+                sale_map[hist_futs[fut]] = recent(fut.result())
+            # skipped ML bargains still get a trade discount from the cache
+            for _, _, hkey in rows:
+                if hkey not in sale_map and (cached := hist_cache.get(hkey)) is not None:
+                    sale_map[hkey] = recent(cached)
+
+            # report in the market's --sort order; lines for this cycle go
+            # to stdout in one write, even if a later listing raises
+            out: List[str] = []
+            try:
+                for lst, mld, hkey in rows:
+                    sale_prices = sale_map.get(hkey)
+                    tdd = trade_discount(lst, sale_prices) if sale_prices else None
+                    report(out, lst, mld, tdd)
+            finally:
+                if out:
+                    sys.stdout.write("\n".join(out) + "\n")
+                    sys.stdout.flush()
+
+            if args.once:
+                break
+            time.sleep(args.interval)
 
 if __name__ == "__main__":
     main()